@@ -7,6 +7,7 @@
 """
 import json
 import logging.config
+import logging.handlers
 import os
 import pickle
 import random
@@ -17,13 +18,22 @@ import ntplib
 import time
 from time import sleep
 import concurrent.futures
+import collections
+import queue
+import threading
+import atexit
+import asyncio
+import aiohttp
+import redis
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pyfiglet
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from selenium import webdriver
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -31,12 +41,161 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 
+class WebDriverPool:
+    """
+    Pool of reusable web drivers, recycled after max_uses acquisitions or max_age_s seconds
+    """
+    def __init__(self, create_driver, quit_driver, size=5, max_uses=50, max_age_s=3600):
+        self.create_driver = create_driver
+        self.quit_driver = quit_driver
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age_s = max_age_s
+        # Driver stats as {driver: [created time, uses]}
+        self._drivers = {}
+        self._idle = []
+        self._pending = 0
+        self._condition = threading.Condition()
+        atexit.register(self.close)
+
+    def _is_expired(self, driver):
+        created, uses = self._drivers[driver]
+        return uses >= self.max_uses or time.time() - created > self.max_age_s
+
+    # Check if a driver in use is due for recycling
+    def is_expired(self, driver):
+        with self._condition:
+            return self._is_expired(driver)
+
+    def _discard(self, driver):
+        with self._condition:
+            self._drivers.pop(driver, None)
+            self._condition.notify()
+        self.quit_driver(driver)
+
+    # Get an idle driver, create a new one if the pool is not full
+    def acquire(self):
+        # Expired idle drivers are quit outside the lock, closing a browser can take seconds
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    if self._idle:
+                        driver = self._idle.pop()
+                        if not self._is_expired(driver):
+                            return driver
+                        self._drivers.pop(driver)
+                        expired.append(driver)
+                    elif len(self._drivers) + self._pending < self.size:
+                        self._pending += 1
+                        break
+                    else:
+                        self._condition.wait()
+        finally:
+            for expired_driver in expired:
+                self.quit_driver(expired_driver)
+        try:
+            driver = self.create_driver()
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify()
+        with self._condition:
+            self._drivers[driver] = [time.time(), 0]
+        return driver
+
+    # Return the driver to the pool, quit it if expired or broken
+    def release(self, driver):
+        with self._condition:
+            self._drivers[driver][1] += 1
+            expired = self._is_expired(driver)
+        if not expired:
+            try:
+                driver.delete_all_cookies()
+            except WebDriverException:
+                expired = True
+        if expired:
+            self._discard(driver)
+            return
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify()
+
+    # Quit all the drivers
+    def close(self):
+        with self._condition:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+            self._idle.clear()
+        for driver in drivers:
+            self.quit_driver(driver)
+
+
+class OpenSeaAPIClient:
+    """
+    Async client of the OpenSea API v2 to get collection listings without a browser
+    """
+    API_URL = "https://api.opensea.io/api/v2"
+
+    def __init__(self, session, api_key, chain="ethereum", listing_types=("english",)):
+        self.session = session
+        self.api_key = api_key
+        self.chain = chain
+        # Listing types to keep, english auctions match the browser's ON_AUCTION filter, empty keeps all the listings
+        self.listing_types = set(listing_types)
+
+    async def _get(self, path, params=None):
+        async with self.session.get(f"{self.API_URL}{path}", params=params, headers={"X-API-KEY": self.api_key}) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    # Get the listings of the collection with the configured types as [(price, url)]
+    async def fetch_listings(self, slug):
+        listings = []
+        params = {"limit": 100}
+        while True:
+            data = await self._get(f"/listings/collection/{slug}/all", params=params)
+            for listing in data.get("listings", []):
+                if self.listing_types and listing.get("type") not in self.listing_types:
+                    continue
+                # Skip the malformed listings, not the whole collection
+                try:
+                    price = listing["price"]["current"]
+                    offer = listing["protocol_data"]["parameters"]["offer"][0]
+                    listing_url = f"https://opensea.io/assets/{self.chain}/{offer['token']}/{offer['identifierOrCriteria']}"
+                    listings.append((int(price["value"]) / 10 ** int(price["decimals"]), listing_url))
+                except (KeyError, IndexError, TypeError, ValueError, AttributeError) as exc:
+                    logging.getLogger().info(f"Skipping malformed listing of {slug}: {exc!r}")
+            if not data.get("next"):
+                return listings
+            params = {"limit": 100, "next": data["next"]}
+
+    # Get the number of values of a collection trait, as shown in the trait filter header
+    async def fetch_trait_count(self, slug, trait="balance"):
+        data = await self._get(f"/traits/{slug}")
+        return len(data.get("counts", {}).get(trait, {}))
+
+
 class OpenSeaAlertBot:
+    # Extracts [price text, url] of every listing card in a single WebDriver round-trip
+    ITEM_CARDS_SCRIPT = """
+        return Array.from(document.querySelectorAll('article')).map(a => {
+            const p = a.querySelector('[data-testid="ItemCardPrice"] span span');
+            const l = a.querySelector('a');
+            return [p ? p.innerText : null, l ? l.href : null];
+        });
+    """
+    # Maximum number of Telegram messages waiting to be sent
+    ALERT_QUEUE_SIZE = 100
+    # Removes the thousands separators of the numbers shown on OpenSea
+    NUMBER_TRANSLATION = str.maketrans('', '', ',')
+
     def __init__(self):
         self.PROJECT_ROOT = Path(os.path.abspath(os.path.dirname(__file__)))
         self.file_settings = str(self.PROJECT_ROOT / 'BotRes/Settings.json')
         self.file_nft_alerts = self.PROJECT_ROOT / 'BotRes/NFTAlerts.csv.csv'
         self.OPENSEA_HOME_URL = "https://opensea.io/"
+        self._settings = None
         self.settings = self.get_settings()
         self.client_secret_file_name = self.settings['settings']['ClientSecretFileName']
         self.api_token_chatbot = self.settings['settings']['ChatBotToken']
@@ -45,10 +204,46 @@ class OpenSeaAlertBot:
         self.work_sheet = self.settings['settings']['WorkSheet']
         self.ratio = float(self.settings['settings']['Ratio'])
         self.busd_price = self.settings['settings']['BUSDPrice']
+        self.collection_urls = self.settings['settings'].get('CollectionURLs', [self.settings['settings']['CollectionURL']])
+        self.use_api = self.settings['settings'].get('UseAPI', False)
+        self.monitor_cycles = int(self.settings['settings'].get('MonitorCycles', 100))
+        self.scan_interval = float(self.settings['settings'].get('ScanInterval', 5))
+        self.batch_flush_interval = float(self.settings['settings'].get('BatchFlushInterval', 0))
         self.file_client_secret = str(self.PROJECT_ROOT / f'BotRes/{self.client_secret_file_name}')
         self.LOGGER = self.get_logger()
+        self._user_agents = self._load_lines(self.PROJECT_ROOT / 'BotRes/user_agents.txt')
+        self._proxies = self._load_lines(self.PROJECT_ROOT / 'BotRes/proxies.txt')
         self.driver = None
+        self.http = self.get_http_session()
+        self._alert_buffer = []
+        self._alert_lock = threading.Lock()
+        self._last_flush = 0
+        # Telegram messages waiting to be sent as (text, alerted keys), drained in FIFO order by the sender thread
+        self._alert_queue = collections.deque()
+        self._alert_event = threading.Event()
+        threading.Thread(target=self._alert_sender, daemon=True).start()
+        # Spreadsheet updates waiting to be written by the sheet worker thread
+        self._sheet_q = queue.Queue(maxsize=4)
+        threading.Thread(target=self._sheet_worker, daemon=True).start()
+        self.alert_ttl = int(self.settings['settings'].get('AlertTTL', 3600))
+        self.redis = self.get_redis()
+        # In-memory fallback of the alerted listings as {key: expiry time}
+        self._alerted = {}
+        # Each collection's worker never returns, so every collection needs its own thread and browser
+        self.threads_count = self.settings['settings'].get('ThreadsCount', 5)
+        if self.threads_count < len(self.collection_urls):
+            self.LOGGER.warning(f"ThreadsCount {self.threads_count} is lower than the {len(self.collection_urls)} collections, using one thread per collection")
+            self.threads_count = len(self.collection_urls)
+        self.pool = WebDriverPool(create_driver=self.get_driver, quit_driver=self.finish,
+                                  size=self.threads_count,
+                                  max_uses=self.settings['settings'].get('DriverMaxUses', 50),
+                                  max_age_s=self.settings['settings'].get('DriverMaxAge', 3600))
         self.spreadsheet_auth = self.get_spreadsheet_auth(spread_sheet=self.spread_sheet)
+        self._spreadsheet = self.get_spreadsheet()
+        self._worksheet = self._spreadsheet.worksheet(self.work_sheet)
+        # Worksheets of the collections as {collection: worksheet}, and the number of rows last written to them
+        self._worksheets = {}
+        self._worksheet_rows = {}
 
     # Get self.LOGGER
     @staticmethod
@@ -97,7 +292,14 @@ class OpenSeaAlertBot:
                      "handlers": ["console", "file"]
                      }
         })
-        return logging.getLogger()
+        # Hand the records to a background listener, so logging never waits for the console or file I/O
+        root = logging.getLogger()
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        listener.start()
+        atexit.register(listener.stop)
+        return root
 
     @staticmethod
     def enable_cmd_colors():
@@ -120,44 +322,162 @@ class OpenSeaAlertBot:
         Creates default or loads existing settings file.
         :return: settings
         """
+        if self._settings is not None:
+            return self._settings
         if os.path.isfile(self.file_settings):
             with open(self.file_settings, 'r') as f:
-                settings = json.load(f)
-            return settings
-        settings = {"Settings": {
+                self._settings = json.load(f)
+            return self._settings
+        settings = {"settings": {
             "ThreadsCount": 5
         }}
         with open(self.file_settings, 'w') as f:
             json.dump(settings, f, indent=4)
-        with open(self.file_settings, 'r') as f:
-            settings = json.load(f)
+        self._settings = settings
         return settings
 
+    # Load non-empty lines of a resource file
+    @staticmethod
+    def _load_lines(file_path):
+        with open(file_path) as f:
+            return [line.strip() for line in f if line.strip()]
+
     # Get random user-agent
     def get_user_agent(self):
-        file_uagents = self.PROJECT_ROOT / 'BotRes/user_agents.txt'
-        with open(file_uagents) as f:
-            content = f.readlines()
-        u_agents_list = [x.strip() for x in content]
-        return random.choice(u_agents_list)
+        return random.choice(self._user_agents)
 
-    # Get random user-agent
+    # Get random proxy
     def get_proxy(self):
-        file_proxies = self.PROJECT_ROOT / 'BotRes/proxies.txt'
-        with open(file_proxies) as f:
-            content = f.readlines()
-        proxy_list = [x.strip() for x in content]
-        proxy = random.choice(proxy_list)
+        proxy = random.choice(self._proxies)
         self.LOGGER.info(f'Proxy selected: {proxy}')
         return proxy
 
-    # Send Telegram message
-    def send_telegram_msg(self, msg):
-        self.LOGGER.info(f'Sending Telegram message: {msg}')
-        send_text = f'https://api.telegram.org/bot{self.api_token_chatbot}/sendMessage?chat_id={self.chat_id}&text={msg}'
-        response = requests.get(str(send_text))
-        self.LOGGER.info(f"Telegram message has been sent")
-        return response.json()
+    # Get HTTP session reusing keep-alive connections
+    @staticmethod
+    def get_http_session():
+        http = requests.Session()
+        # Only connection errors are retried for the Telegram POSTs, the alert sender re-queues the 429 and 5xx responses itself
+        retries = Retry(total=5, backoff_factor=1.0)
+        http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+        return http
+
+    # Send buffered alerts as a few concatenated Telegram messages
+    def _flush_alerts(self):
+        # Take the buffered alerts, possibly filled by several collection workers
+        with self._alert_lock:
+            if not self._alert_buffer or time.time() - self._last_flush < self.batch_flush_interval:
+                return
+            alerts, self._alert_buffer = self._alert_buffer, []
+            self._last_flush = time.time()
+        # Split into chunks under Telegram's 4096 characters message limit
+        # Each message keeps the alerted keys of its listings, to unmark them if it is never delivered
+        chunks, chunk, keys = [], '', []
+        for alert, key in alerts:
+            if chunk and len(chunk) + len(alert) + 1 > 4096:
+                chunks.append((chunk, keys))
+                chunk, keys = '', []
+            chunk = f'{chunk}\n{alert}' if chunk else alert[:4096]
+            keys.append(key)
+        chunks.append((chunk, keys))
+        self.LOGGER.info(f'Queueing {len(alerts)} alerts in {len(chunks)} Telegram messages')
+        dropped = []
+        with self._alert_lock:
+            for message in chunks:
+                if len(self._alert_queue) >= self.ALERT_QUEUE_SIZE:
+                    self.LOGGER.warning(f"Telegram alerts queue is full, dropping message: {message[0]}")
+                    dropped.append(message)
+                    continue
+                self._alert_queue.append(message)
+        for _, keys in dropped:
+            self._unmark_alerted(keys=keys)
+        self._alert_event.set()
+
+    # Send the queued Telegram messages, waiting for Telegram's retry_after when rate limited or on server errors
+    def _alert_sender(self):
+        send_url = f'https://api.telegram.org/bot{self.api_token_chatbot}/sendMessage'
+        while True:
+            self._alert_event.wait()
+            self._alert_event.clear()
+            while True:
+                with self._alert_lock:
+                    if not self._alert_queue:
+                        break
+                    message = self._alert_queue.popleft()
+                chunk, keys = message
+                retry_after = 0
+                try:
+                    response = self.http.post(send_url, json={"chat_id": self.chat_id, "text": chunk}, timeout=10)
+                    if response.status_code == 429:
+                        retry_after = response.json().get("parameters", {}).get("retry_after", 5)
+                        self.LOGGER.info(f'Telegram rate limited, retrying in {retry_after} seconds')
+                    elif response.status_code >= 500:
+                        retry_after = 5
+                        self.LOGGER.info(f'Telegram server error {response.status_code}, retrying in {retry_after} seconds')
+                except ValueError:
+                    retry_after = 5
+                except requests.RequestException as exc:
+                    self.LOGGER.info(f'Issue while sending Telegram message: {exc}, retrying in 5 seconds')
+                    retry_after = 5
+                if retry_after:
+                    # Put the message back in front and retry the queue once the delay has elapsed
+                    dropped = None
+                    with self._alert_lock:
+                        if len(self._alert_queue) >= self.ALERT_QUEUE_SIZE:
+                            dropped = self._alert_queue.pop()
+                            self.LOGGER.warning(f"Telegram alerts queue is full, dropping message: {dropped[0]}")
+                        self._alert_queue.appendleft(message)
+                    if dropped:
+                        self._unmark_alerted(keys=dropped[1])
+                    sleep(retry_after)
+                elif not response.ok:
+                    self.LOGGER.info(f'Telegram message rejected: {response.status_code} {response.text}')
+                    self._unmark_alerted(keys=keys)
+                else:
+                    self.LOGGER.info(f"Telegram alert has been sent")
+
+    # Get Redis client of the already alerted listings, None if Redis is unreachable
+    def get_redis(self):
+        client = redis.Redis(host=self.settings['settings'].get('RedisHost', 'localhost'),
+                             port=self.settings['settings'].get('RedisPort', 6379), decode_responses=True,
+                             socket_connect_timeout=2, socket_timeout=2)
+        try:
+            client.ping()
+        except redis.RedisError as exc:
+            self.LOGGER.info(f'Redis is unreachable, using in-memory alerted listings: {exc}')
+            return None
+        return client
+
+    # Mark the listing as alerted, returns False if it had already been alerted
+    def _mark_alerted(self, key):
+        if self.redis is not None:
+            try:
+                # NX sets the key only if absent, so concurrent workers won't alert twice
+                return bool(self.redis.set(key, '1', ex=self.alert_ttl, nx=True))
+            except redis.RedisError as exc:
+                self.LOGGER.info(f'Redis is unreachable, using in-memory alerted listings: {exc}')
+                self.redis = None
+        now = time.time()
+        with self._alert_lock:
+            # Keys are kept in expiry order, so the expired ones are pruned from the oldest
+            while self._alerted and next(iter(self._alerted.values())) <= now:
+                self._alerted.pop(next(iter(self._alerted)))
+            if key in self._alerted:
+                return False
+            self._alerted[key] = now + self.alert_ttl
+            return True
+
+    # Unmark the listings of an undelivered message, so they are alerted again on the next cycle
+    def _unmark_alerted(self, keys):
+        if self.redis is not None:
+            try:
+                self.redis.delete(*keys)
+                return
+            except redis.RedisError as exc:
+                self.LOGGER.info(f'Redis is unreachable, using in-memory alerted listings: {exc}')
+                self.redis = None
+        with self._alert_lock:
+            for key in keys:
+                self._alerted.pop(key, None)
 
     # Get web driver
     def get_driver(self, proxy=False, headless=False):
@@ -183,8 +503,13 @@ class OpenSeaAlertBot:
         options.add_experimental_option('excludeSwitches', ['enable-logging'])
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        # Only the DOM is needed, don't wait for or load the page resources
+        options.page_load_strategy = 'eager'
         prefs = {"profile.default_content_setting_values.geolocation": 2,
-                 "profile.managed_default_content_setting_values.images": 2}
+                 "profile.managed_default_content_setting_values.images": 2,
+                 "profile.managed_default_content_setting_values.stylesheets": 2,
+                 "profile.managed_default_content_setting_values.fonts": 2,
+                 "profile.managed_default_content_setting_values.plugins": 2}
         options.add_experimental_option("prefs", prefs)
         options.add_argument(F'--user-agent={self.get_user_agent()}')
         if proxy:
@@ -192,6 +517,13 @@ class OpenSeaAlertBot:
         if headless:
             options.add_argument('--headless')
         driver = webdriver.Chrome(service=service, options=options)
+        # Block media, fonts and trackers requests, quit the browser if it fails as the pool doesn't own it yet
+        try:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": ["*.png", "*.jpg", "*.webp", "*.mp4", "*.woff*", "*google-analytics.com/*", "*doubleclick.net/*"]})
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception:
+            driver.quit()
+            raise
         return driver
 
     # Finish and quit browser
@@ -223,6 +555,11 @@ class OpenSeaAlertBot:
         elif tag_name:
             WebDriverWait(driver, duration, frequency).until(EC.visibility_of_element_located((By.TAG_NAME, tag_name)))
 
+    # Wait until the element has a non-empty text, the element may be re-rendered while polling
+    @staticmethod
+    def wait_until_has_text(driver, css_selector, duration=10, frequency=0.1):
+        WebDriverWait(driver, duration, frequency, ignored_exceptions=(StaleElementReferenceException,)).until(lambda d: d.find_element(By.CSS_SELECTOR, css_selector).text.strip() != '')
+
     # Authenticate to the Google SpreadSheet
     def get_spreadsheet_auth(self, spread_sheet="YN Ratio Sheet"):
         self.LOGGER.info(f'Getting SpreadSheet Auth: {spread_sheet}')
@@ -231,61 +568,112 @@ class OpenSeaAlertBot:
         spreadsheet_auth = gspread.authorize(credentials)
         return spreadsheet_auth
 
+    # Opens the SpreadSheet by key, skipping the Drive search by name when the key is set
+    def get_spreadsheet(self):
+        spread_sheet_key = self.settings['settings'].get('SpreadSheetKey')
+        if spread_sheet_key:
+            return self.spreadsheet_auth.open_by_key(spread_sheet_key)
+        return self.spreadsheet_auth.open(self.spread_sheet)
+
+    # Gets the collection's WorkSheet, a single collection uses the configured one, several get one per collection
+    def get_worksheet(self, collection):
+        if len(self.collection_urls) == 1:
+            return self._worksheet
+        if collection not in self._worksheets:
+            try:
+                worksheet = self._spreadsheet.worksheet(collection)
+            except gspread.exceptions.WorksheetNotFound:
+                self.LOGGER.info(f"Adding WorkSheet: {collection}")
+                worksheet = self._spreadsheet.add_worksheet(title=collection, rows=1000, cols=3)
+                worksheet.update(range_name="A1:C1", values=[["Listing Price", "Account Value", "Link"]])
+            self._worksheets[collection] = worksheet
+        return self._worksheets[collection]
+
     # Gets NFT collection information from SpreadSheet
-    def get_nft_info(self, spreadsheet_auth, spread_sheet, work_sheet="Sheet1"):
-        spreadsheet = spreadsheet_auth.open(spread_sheet)
-        worksheet = spreadsheet.worksheet(work_sheet)
-        df = pd.DataFrame(worksheet.get_all_records())
-        return [profile["Profile"] for profile in df.iloc]
+    def get_nft_info(self):
+        records = self._worksheet.get_all_records()
+        return [record["Profile"] for record in records]
 
     # Updates Twitter handles in the SpreadSheet using Google Drive API
-    def update_spreadsheet(self, df, spread_sheet, work_sheet="Sheet1"):
-        self.LOGGER.info(f"Updating Spreadsheet: {spread_sheet}")
-        spreadsheet = self.spreadsheet_auth.open(spread_sheet)
-        worksheet = spreadsheet.worksheet(work_sheet)
-
-        # Convert DataFrame to String
-        # df = df.applymap(str)
+    def update_spreadsheet(self, collection, listing_prices, trait_balances, listing_urls):
+        worksheet = self.get_worksheet(collection)
+        self.LOGGER.info(f"Updating Spreadsheet: {self.spread_sheet}: WorkSheet: {worksheet.title}")
+
+        # Arrays are converted to native values for the JSON request body
+        values = [list(row) for row in zip(np.asarray(listing_prices).tolist(), np.asarray(trait_balances).tolist(), listing_urls)]
+        # Blank the rows left from a previous update with more listings, the first update counts the rows left by a previous run
+        if worksheet.title not in self._worksheet_rows:
+            self._worksheet_rows[worksheet.title] = len(worksheet.get_values(range_name="A2:C"))
+        previous_rows = self._worksheet_rows[worksheet.title]
+        values += [["", "", ""]] * (previous_rows - len(values))
+        if not values:
+            self.LOGGER.info(f"No listing to update in Spreadsheet: {self.spread_sheet}")
+            return
 
-        # Get values from each column of the DataFrame
-        listing_prices = df["Listing Price"].values.tolist()
-        trait_balances = df["Account Value"].values.tolist()
-        listing_urls = df["Link"].values.tolist()
+        # Grow the sheet if the listings don't fit its grid
+        if len(values) + 1 > worksheet.row_count:
+            self.LOGGER.info(f"Resizing WorkSheet: {worksheet.title} to {len(values) + 1} rows")
+            worksheet.resize(rows=len(values) + 1)
 
-        # Select a range of cells of the first three columns to update
-        cell_list_column_1 = worksheet.range(f'A2:A{len(listing_prices) + 1}')
-        cell_list_column_2 = worksheet.range(f'B2:B{len(listing_prices) + 1}')
-        cell_list_column_3 = worksheet.range(f'C2:C{len(listing_prices) + 1}')
+        # Update the first three columns with a single 2D range write
+        worksheet.update(range_name=f"A2:C{len(values) + 1}", values=values, value_input_option="USER_ENTERED")
+        self._worksheet_rows[worksheet.title] = len(listing_urls)
 
-        # Assign the values to the cells
-        for i, cell_column_1 in enumerate(cell_list_column_1):
-            cell_column_1.value = listing_prices[i]
-            cell_list_column_2[i].value = trait_balances[i]
-            cell_list_column_3[i].value = listing_urls[i]
+        self.LOGGER.info(f'Updated SpreadSheet: {self.spread_sheet}: WorkSheet: {worksheet.title}')
 
-        # Update in batch
-        worksheet.update_cells(cell_list_column_1)
-        worksheet.update_cells(cell_list_column_2)
-        worksheet.update_cells(cell_list_column_3)
+    # Writes the queued updates to the SpreadSheet, so the scraping never waits for it
+    def _sheet_worker(self):
+        while True:
+            item = self._sheet_q.get()
+            try:
+                self.update_spreadsheet(*item)
+            except Exception as exc:
+                self.LOGGER.info(f'Issue while updating SpreadSheet: {exc}')
+            finally:
+                self._sheet_q.task_done()
+
+    # Queues the collection stats for the sheet worker, dropped if it is too far behind
+    def queue_spreadsheet_update(self, collection, listing_prices, trait_balances, listing_urls):
+        try:
+            self._sheet_q.put_nowait((collection, listing_prices, trait_balances, listing_urls))
+        except queue.Full:
+            self.LOGGER.warning(f"SpreadSheet updates queue is full, dropping collection stats update")
 
-        self.LOGGER.info(f'Updated SpreadSheet: {spread_sheet}: WorkSheet: {work_sheet}')
+    @staticmethod
+    def get_collection_slug(collection_url):
+        return collection_url.rstrip('/').rsplit('/', 1)[-1]
 
+    # Restarts the monitoring of the collection with a pooled driver whenever it returns
     def get_nft_alerts(self, collection_url):
+        while True:
+            self.LOGGER.info(f"Monitoring NFT Collection: {collection_url}")
+            try:
+                driver = self.pool.acquire()
+            except WebDriverException as exc:
+                self.LOGGER.info(f'Issue while launching browser: {exc.args}')
+                sleep(self.scan_interval)
+                continue
+            try:
+                self.monitor_collection(driver=driver, collection_url=collection_url)
+            except Exception as exc:
+                # Any failure, e.g. an unexpected trait balance text, restarts the monitoring instead of ending it
+                self.LOGGER.info(f'Issue while monitoring collection: {exc!r}')
+            finally:
+                self.pool.release(driver)
+            sleep(self.scan_interval)
+
+    def monitor_collection(self, driver, collection_url):
         # OpenSea filter to get NFTs on auction or sale
         auction_filer = '?search[toggles][0]=ON_AUCTION'
-
-        self.LOGGER.info(f"Monitoring NFT Collection: {collection_url}")
-        driver = self.get_driver()
+        collection = self.get_collection_slug(collection_url)
 
         # Go to the collection's auction
         driver.get(collection_url + auction_filer)
-        sleep(3)
 
         # Wait for the collection to load
         try:
             self.LOGGER.info(f"Waiting for collection")
             self.wait_until_visible(driver=driver, css_selector='[data-testid="phoenix-header"]', duration=10)
-            sleep(3)
             # Scroll to the bottom to view the trait Balance into view
             driver.find_element(By.TAG_NAME, 'html').send_keys(Keys.END)
             driver.find_element(By.TAG_NAME, 'html').send_keys(Keys.END)
@@ -302,80 +690,123 @@ class OpenSeaAlertBot:
         # except:
         #     pass
 
-        # Monitor the NFT prices
-        while True:
+        # Monitor the NFT prices, return every monitor_cycles cycles so the driver is recycled by the pool
+        for _ in range(self.monitor_cycles):
+            if self.pool.is_expired(driver):
+                return
             # Wait for trait balance
             try:
                 self.LOGGER.info(f"Getting trait balance")
-                self.wait_until_visible(driver=driver, css_selector='[id="Header trait-filter-balance"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]', duration=10)
-                # self.wait_until_visible(driver=driver, css_selector='[id="Header trait-filter-Beard"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]', duration=10)
-                sleep(5)
+                self.wait_until_has_text(driver=driver, css_selector='[id="Header trait-filter-balance"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]', duration=10)
+                # self.wait_until_has_text(driver=driver, css_selector='[id="Header trait-filter-Beard"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]', duration=10)
             except:
                 return
 
             # Get trait balance
-            trait_balance = int(driver.find_element(By.CSS_SELECTOR, '[id="Header trait-filter-balance"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]').text)
-            # trait_balance = float(driver.find_element(By.CSS_SELECTOR, '[id="Header trait-filter-Beard"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]').text.replace(',', ''))
-
-            trait_balances = []
-            listing_prices = []
-            listing_urls = []
+            trait_balance = int(driver.find_element(By.CSS_SELECTOR, '[id="Header trait-filter-balance"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]').text.translate(self.NUMBER_TRANSLATION))
+            # trait_balance = float(driver.find_element(By.CSS_SELECTOR, '[id="Header trait-filter-Beard"] [class="sc-29427738-0 sc-bgqQcB cKdnBO hktnSP"]').text.translate(self.NUMBER_TRANSLATION))
 
             # Wait for the listing items
             try:
                 # Get collection prices
                 self.LOGGER.info(f"Waiting for items")
                 self.wait_until_visible(driver=driver, tag_name='article', duration=20)
-                sleep(3)
+                # Wait once for the listing prices, not per item
+                # self.wait_until_has_text(driver=driver, css_selector='[class="sc-8a1b6610-0 irKuNm Price--fiat-amount"]', duration=10)
+                self.wait_until_has_text(driver=driver, css_selector='[data-testid="ItemCardPrice"] span span', duration=10)
             except:
                 self.LOGGER.info(f"No item found, going to next cycle")
                 sleep(3)
                 continue
 
-            # Loop through all the listing prices, send notification if condition is matched
-            # for listing_item in driver.find_elements(By.CSS_SELECTOR, '[role="listitem"]'):
-            for listing_item in driver.find_elements(By.TAG_NAME, 'article'):
-                # Wait and get the listing price
-                # self.wait_until_visible(driver=driver, css_selector='[class="sc-8a1b6610-0 irKuNm Price--fiat-amount"]', duration=10)
-                self.wait_until_visible(driver=driver, css_selector='[data-testid="ItemCardPrice"] span span', duration=10)
-                listing_price = float(listing_item.find_element(By.CSS_SELECTOR, '[data-testid="ItemCardPrice"] span span').text.replace(',', '')) * self.busd_price
-                # self.LOGGER.info(f"Listing price: {listing_price}")
-
-                # Get the listing url
-                # listing_url = listing_item.find_element(By.CSS_SELECTOR, '[class="sc-1f719d57-0 eiItIQ sc-8421f217-0 ewDElI"]').get_attribute('href')
-                # listing_url = listing_item.find_element(By.CSS_SELECTOR, '[data-testid="ItemCardFooter-name"]').get_attribute('href')
-                listing_url = listing_item.find_element(By.TAG_NAME, 'a').get_attribute('href')
-
-                # Calculate ratio and send to the spreadsheet along with the listing URL and trait balance
-                ratio = round(trait_balance / listing_price, 2)
-                self.LOGGER.info(f"Set Ratio: {self.ratio}")
-                collection_stats = {"Listing Price": listing_price, "Account Value": trait_balance, "Ratio": ratio, "Link": listing_url}
-
-                # Check if the ratio between trait_balance and listing_price >= 20
-                self.LOGGER.info(f"{collection_stats} Condition matched: {ratio >= self.ratio}")
-                if ratio >= self.ratio:
-                    # Send the dictionary to Telegram ChatBot
-                    self.send_telegram_msg(msg=collection_stats)
-
-                # Append values to their respective lists
-                listing_prices.append(listing_price)
-                trait_balances.append(trait_balance)
-                listing_urls.append(listing_url)
-            # Create a dictionary of the stats
-            collection_stats = {"Listing Price": listing_prices, "Account Value": trait_balances, "Link": listing_urls}
-            # self.LOGGER.info(f'Collection Stats: {str(collection_stats)}')
-            df = pd.DataFrame(collection_stats)
-            # Update the spreadsheet
-            self.update_spreadsheet(df=df, spread_sheet=self.spread_sheet, work_sheet=self.work_sheet)
-            self.LOGGER.info(f"collection stats have been updated in Spreadsheet: {self.spread_sheet}")
+            # Get the listing prices and urls of all the items at once
+            listing_items = driver.execute_script(self.ITEM_CARDS_SCRIPT)
+            listings = []
+            for price_text, listing_url in listing_items:
+                # Skip the cards without a plain number price, e.g. '< 0.01' or '1.2K'
+                try:
+                    listings.append((float(price_text.translate(self.NUMBER_TRANSLATION)) * self.busd_price, listing_url))
+                except (AttributeError, ValueError):
+                    continue
+            listing_prices, trait_balances, listing_urls = self.process_listings(collection=collection, trait_balance=trait_balance, listings=listings)
+            # Send the buffered alerts
+            self._flush_alerts()
+            # Update the spreadsheet in the background
+            self.queue_spreadsheet_update(collection=collection, listing_prices=listing_prices, trait_balances=trait_balances, listing_urls=listing_urls)
+            sleep(self.scan_interval)
+
+    # Calculates the ratios and buffers the alerts of the listings matching the condition
+    def process_listings(self, collection, trait_balance, listings):
+        # Columns of the spreadsheet, the trait balance is the same for all the listings
+        listing_prices = np.fromiter((listing_price for listing_price, _ in listings), dtype=np.float64, count=len(listings))
+        trait_balances = np.full(len(listings), trait_balance, dtype=np.int64)
+        listing_urls = [listing_url for _, listing_url in listings]
+
+        # Calculate the ratios of all the listings at once, listings without a positive price get no ratio
+        valid_prices = listing_prices > 0
+        ratios = np.full(len(listings), np.nan)
+        np.divide(trait_balance, listing_prices, out=ratios, where=valid_prices)
+        ratios = np.round(ratios, 2)
+        self.LOGGER.info(f"Set Ratio: {self.ratio}")
+
+        # Send notification for the listings where the ratio between trait_balance and listing_price >= 20
+        matches = np.flatnonzero(valid_prices & (ratios >= self.ratio))
+        self.LOGGER.info(f"{len(matches)} of {len(listings)} listings matched the condition")
+        for i in matches:
+            listing_price, ratio, listing_url = float(listing_prices[i]), float(ratios[i]), listing_urls[i]
+            collection_stats = {"Listing Price": listing_price, "Account Value": trait_balance, "Ratio": ratio, "Link": listing_url}
+            self.LOGGER.info(f"{collection_stats} Condition matched: True")
+            key = f"seen:{collection}:{listing_url}:{int(listing_price * 100)}"
+            if self._mark_alerted(key=key):
+                # Buffer the alert, sent to Telegram ChatBot once per cycle
+                with self._alert_lock:
+                    self._alert_buffer.append((f"{listing_price} | {ratio} | {listing_url}", key))
+        return listing_prices, trait_balances, listing_urls
+
+    # Monitors the NFT collection prices through the OpenSea API
+    async def get_nft_alerts_api(self, client, collection_url):
+        slug = self.get_collection_slug(collection_url)
+        self.LOGGER.info(f"Monitoring NFT Collection through API: {slug}")
+        while True:
+            try:
+                trait_balance = await client.fetch_trait_count(slug)
+                listings = await client.fetch_listings(slug)
+            except Exception as exc:
+                self.LOGGER.info(f"Issue while getting listings: {exc!r}, going to next cycle")
+                await asyncio.sleep(self.scan_interval)
+                continue
+            listings = [(price * self.busd_price, listing_url) for price, listing_url in listings]
+            # Processing marks the alerted listings in Redis, run it off the event loop
+            listing_prices, trait_balances, listing_urls = await asyncio.to_thread(self.process_listings, slug, trait_balance, listings)
+            # Send the buffered alerts and update the spreadsheet, both are handed to background threads
+            self._flush_alerts()
+            self.queue_spreadsheet_update(collection=slug, listing_prices=listing_prices, trait_balances=trait_balances, listing_urls=listing_urls)
+            await asyncio.sleep(self.scan_interval)
+
+    async def run_all(self, collection_urls):
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            client = OpenSeaAPIClient(session=session, api_key=self.settings['settings'].get('OpenSeaAPIKey', ''),
+                                      chain=self.settings['settings'].get('Chain', 'ethereum'),
+                                      listing_types=self.settings['settings'].get('APIListingTypes', ["english"]))
+            # A failing collection doesn't cancel the monitoring of the others
+            results = await asyncio.gather(*(self.get_nft_alerts_api(client, collection_url) for collection_url in collection_urls), return_exceptions=True)
+            for collection_url, result in zip(collection_urls, results):
+                if isinstance(result, Exception):
+                    self.LOGGER.info(f"Stopped monitoring NFT Collection {collection_url}: {result!r}")
 
     def main(self):
         freeze_support()
         self.enable_cmd_colors()
         self.banner()
         self.LOGGER.info(f'OpenSeaAlertBot launched')
-        collection_url = self.settings["settings"]["CollectionURL"]
-        self.get_nft_alerts(collection_url=collection_url)
+        # Monitor all the collections concurrently through the OpenSea API
+        if self.use_api:
+            asyncio.run(self.run_all(self.collection_urls))
+            return
+        # Monitor each collection in its own thread, every worker launches its own browser
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads_count) as executor:
+            list(executor.map(self.get_nft_alerts, self.collection_urls))
 
 
 if __name__ == '__main__':